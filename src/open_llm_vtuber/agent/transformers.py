@@ -132,8 +132,8 @@ def tts_filter(
                         ignore_angle_brackets=config.ignore_angle_brackets,
                     )
 
-                logger.debug(f"display: {display}")
-                logger.debug(f"tts: {tts}")
+                logger.debug("display: {}", display)
+                logger.debug("tts: {}", tts)
 
                 yield SentenceOutput(
                     display_text=display,
@@ -1,13 +1,89 @@
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Callable
 import numpy as np
 from loguru import logger
 import azure.cognitiveservices.speech as speechsdk
-from azure.cognitiveservices.speech.audio import AudioConfig
+from azure.cognitiveservices.speech.audio import (
+    AudioConfig,
+    AudioStreamFormat,
+    PushAudioInputStream,
+)
 from .asr_interface import ASRInterface
 from src.open_llm_vtuber.global_config import Config
 
-CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+# Number of (text, language) results kept for audio that is sent again
+RESULT_CACHE_SIZE = 256
+# Seconds to wait for Azure to finish a session after the audio has ended
+SESSION_STOP_TIMEOUT = 30
+
+
+def _to_pcm_data(audio: np.ndarray) -> bytes:
+    # Make sure the audio is in the range [-1, 1], scaling it in place
+    samples = np.clip(audio, -1, 1, dtype=np.float32)
+    samples *= 32767
+    # Convert the audio to 16-bit PCM
+    return samples.astype(np.int16).tobytes()
+
+
+class RecognitionSession:
+    """A continuous recognition session started by `VoiceRecognition`."""
+
+    def __init__(
+        self,
+        recognizer: speechsdk.SpeechRecognizer,
+        stream: PushAudioInputStream,
+        callback: Callable,
+    ):
+        self._recognizer = recognizer
+        self._stream = stream
+        self._callback = callback
+        self._config = Config.get_instance()
+        self._stopped = threading.Event()
+        self._texts: list[str] = []
+
+        recognizer.recognized.connect(self._on_recognized)
+        recognizer.canceled.connect(self._on_canceled)
+        recognizer.session_stopped.connect(lambda evt: self._stopped.set())
+
+    def feed(self, audio: np.ndarray) -> None:
+        """Send audio to the session.
+
+        Args:
+            audio: The numpy array of the audio data to transcribe.
+        """
+        self._stream.write(_to_pcm_data(audio))
+
+    def stop(self) -> str:
+        """Stop the session.
+
+        Returns:
+            str: The text recognized during the session.
+        """
+        # Closing the stream lets Azure finish the audio it has received
+        self._stream.close()
+        if not self._stopped.wait(SESSION_STOP_TIMEOUT):
+            logger.warning("Timed out waiting for the recognition session to end")
+        self._recognizer.stop_continuous_recognition()
+        logger.info("Stopped continuous recognition session")
+        return " ".join(self._texts)
+
+    def _on_recognized(self, evt: speechsdk.SpeechRecognitionEventArgs) -> None:
+        if evt.result.reason != speechsdk.ResultReason.RecognizedSpeech:
+            return
+        auto_detect_result = speechsdk.AutoDetectSourceLanguageResult(evt.result)
+        logger.info("Recognized language: {}", auto_detect_result.language)
+        self._config.current_language = auto_detect_result.language
+        self._texts.append(evt.result.text)
+        self._callback(evt.result.text)
+
+    def _on_canceled(self, evt: speechsdk.SpeechRecognitionCanceledEventArgs) -> None:
+        if evt.reason == speechsdk.CancellationReason.Error:
+            logger.error(f"Recognition canceled: {evt.reason}")
+            logger.error(f"Error details: {evt.error_details}")
+        self._stopped.set()
 
 
 class VoiceRecognition(ASRInterface):
@@ -33,9 +109,38 @@ class VoiceRecognition(ASRInterface):
             )
 
         self.callback = callback
+        self._config = Config.get_instance()
+        self._auto_detect_source_language_config = (
+            speechsdk.languageconfig.AutoDetectSourceLanguageConfig(
+                languages=["en-US", "hi-IN", "ml-IN"]
+            )
+        )
+        # Format of the PCM data fed to Azure through a push stream
+        self._stream_format = AudioStreamFormat(
+            samples_per_second=self.SAMPLE_RATE,
+            bits_per_sample=self.SAMPLE_WIDTH * 8,
+            channels=self.NUM_CHANNELS,
+        )
+        # LRU cache of recognition results, keyed by a hash of the PCM data
+        self._result_cache: OrderedDict[bytes, tuple[str, str]] = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+
+    def _get_cached_result(self, key: bytes) -> tuple[str, str] | None:
+        with self._result_cache_lock:
+            result = self._result_cache.get(key)
+            if result is not None:
+                self._result_cache.move_to_end(key)
+            return result
+
+    def _cache_result(self, key: bytes, text: str, language: str) -> None:
+        with self._result_cache_lock:
+            self._result_cache[key] = (text, language)
+            self._result_cache.move_to_end(key)
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
 
     def _create_speech_recognizer(self, uses_default_microphone: bool = True):
-        logger.debug(f"Sub: {self.subscription_key}, Reg: {self.region}")
+        logger.debug("Sub: {}, Reg: {}", self.subscription_key, self.region)
         assert isinstance(
             self.subscription_key, str
         ), "subscription_key must be a string"
@@ -45,32 +150,62 @@ class VoiceRecognition(ASRInterface):
             speech_config=self.speech_config, audio_config=audio_config
         )
 
+    def start_session(self) -> "RecognitionSession":
+        """Start a continuous recognition session.
+
+        Each session has its own stream and recognizer, so several sessions
+        can run on the same engine at once.
+
+        Returns:
+            RecognitionSession: The session to send audio to with `feed` and
+                end with `stop`.
+        """
+        # Continuous language identification keeps detecting the language
+        # through a whole session instead of once per recognition.
+        speech_config = speechsdk.SpeechConfig(
+            subscription=self.subscription_key, region=self.region
+        )
+        speech_config.set_property(
+            speechsdk.PropertyId.SpeechServiceConnection_LanguageIdMode, "Continuous"
+        )
+        stream = PushAudioInputStream(stream_format=self._stream_format)
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=speech_config,
+            audio_config=AudioConfig(stream=stream),
+            auto_detect_source_language_config=self._auto_detect_source_language_config,
+        )
+        session = RecognitionSession(recognizer, stream, self.callback)
+        recognizer.start_continuous_recognition()
+        logger.info("Started continuous recognition session")
+        return session
+
     def transcribe_np(self, audio: np.ndarray) -> str:
         """Transcribe audio using the given parameters.
 
         Args:
             audio: The numpy array of the audio data to transcribe.
         """
-        import soundfile as sf
-
-        temp_file = os.path.join(CACHE_DIR, "temp.wav")
-
-        # Make sure cache directory exists
-        os.makedirs(CACHE_DIR, exist_ok=True)
-
-        # Properly save as WAV file - needs sample rate
-        sf.write(temp_file, audio, 16000)  # Assuming 16kHz sample rate
-
-        audio_config = AudioConfig(filename=temp_file)
-        auto_detect_source_language_config = (
-            speechsdk.languageconfig.AutoDetectSourceLanguageConfig(
-                languages=["en-US", "hi-IN", "ml-IN"]
-            )
-        )
+        pcm_data = _to_pcm_data(audio)
+
+        # The same audio always gives the same result, skip the Azure request
+        cache_key = hashlib.blake2b(pcm_data, digest_size=16).digest()
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            text, language = cached_result
+            logger.info("Using cached recognition, language: {}", language)
+            self._config.current_language = language
+            return text
+
+        # Feed the PCM data to Azure directly instead of through a temp wav file
+        push_stream = PushAudioInputStream(stream_format=self._stream_format)
+        push_stream.write(pcm_data)
+        push_stream.close()
+
+        audio_config = AudioConfig(stream=push_stream)
         speech_recognizer = speechsdk.SpeechRecognizer(
             speech_config=self.speech_config,
             audio_config=audio_config,
-            auto_detect_source_language_config=auto_detect_source_language_config,
+            auto_detect_source_language_config=self._auto_detect_source_language_config,
         )
 
         logger.info("Starting recognition")
@@ -78,10 +213,10 @@ class VoiceRecognition(ASRInterface):
 
         if result.reason == speechsdk.ResultReason.RecognizedSpeech:
             auto_detect_result = speechsdk.AutoDetectSourceLanguageResult(result)
-            logger.info(f"Recognized language: {auto_detect_result.language}")
+            logger.info("Recognized language: {}", auto_detect_result.language)
 
-            config = Config.get_instance()
-            config.current_language = auto_detect_result.language
+            self._config.current_language = auto_detect_result.language
+            self._cache_result(cache_key, result.text, auto_detect_result.language)
 
             return result.text
         elif result.reason == speechsdk.ResultReason.NoMatch:
@@ -1,8 +1,32 @@
 import re
 import unicodedata
+from bisect import bisect_right
+from functools import cache, lru_cache, partial
+import numpy as np
 from loguru import logger
 from ..translate.translate_interface import TranslateInterface
 
+# Text enclosed in double (**) or single (*) asterisks
+_ASTERISKS_PATTERN = re.compile(r"\*\*[^*]+\*\*|\*[^*]+\*")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Major categories kept by `is_valid_char`: letters, numbers and punctuation.
+# Whitespace is checked separately, as tabs and newlines are control characters.
+_VALID_MAJOR_CATEGORIES = frozenset("LNP")
+
+# Scripts kept by `is_valid_char` regardless of category, as inclusive ranges.
+_SCRIPT_RANGES = [
+    (0x0900, 0x097F),  # Hindi (Devanagari), including Hindi numbers
+    (0x0D00, 0x0D7F),  # Malayalam, including Malayalam numbers
+    (0xA8E0, 0xA8FF),  # Devanagari Extended
+    (0x11B00, 0x11B4F),  # Devanagari Extended-A
+]
+# Sorted range boundaries: a code point is inside a range when an odd
+# number of boundaries are less than or equal to it.
+_SCRIPT_RANGE_BOUNDS = [
+    bound for start, end in _SCRIPT_RANGES for bound in (start, end + 1)
+]
+
 
 def tts_filter(
     text: str,
@@ -30,92 +54,208 @@ def tts_filter(
     Returns:
         str: The filtered text.
     """
-    if ignore_asterisks:
-        try:
-            text = filter_asterisks(text)
-        except Exception as e:
-            logger.warning(f"Error ignoring asterisks: {e}")
-            logger.warning(f"Text: {text}")
-            logger.warning("Skipping...")
-
-    if ignore_brackets:
-        try:
-            text = filter_brackets(text)
-        except Exception as e:
-            logger.warning(f"Error ignoring brackets: {e}")
-            logger.warning(f"Text: {text}")
-            logger.warning("Skipping...")
-    if ignore_parentheses:
-        try:
-            text = filter_parentheses(text)
-        except Exception as e:
-            logger.warning(f"Error ignoring parentheses: {e}")
-            logger.warning(f"Text: {text}")
-            logger.warning("Skipping...")
-    if remove_special_char:
-        try:
-            text = remove_special_characters(text)
-        except Exception as e:
-            logger.warning(f"Error removing special characters: {e}")
-            logger.warning(f"Text: {text}")
-            logger.warning("Skipping...")
-    if ignore_angle_brackets:
-        try:
-            text = filter_angle_brackets(text)
-        except Exception as e:
-            logger.warning(f"Error ignoring angle brackets: {e}")
-            logger.warning(f"Text: {text}")
-            logger.warning("Skipping...")
+    text = _filter_text(
+        text,
+        remove_special_char,
+        ignore_brackets,
+        ignore_parentheses,
+        ignore_asterisks,
+        ignore_angle_brackets,
+    )
     if translator:
         try:
             logger.info("Translating...")
             text = translator.translate(text)
-            logger.info(f"Translated: {text}")
+            logger.info("Translated: {}", text)
         except Exception as e:
             logger.critical(f"Error translating: {e}")
             logger.critical(f"Text: {text}")
             logger.warning("Skipping...")
 
-    logger.debug(f"Filtered text: {text}")
+    logger.debug("Filtered text: {}", text)
     return text
 
 
+@lru_cache(maxsize=2048)
+def _filter_text(
+    text: str,
+    remove_special_char: bool,
+    ignore_brackets: bool,
+    ignore_parentheses: bool,
+    ignore_asterisks: bool,
+    ignore_angle_brackets: bool,
+) -> str:
+    """
+    The filtering steps of `tts_filter`, without translation. The result only
+    depends on the arguments, so it is cached for sentences that come up again.
+    """
+    # Brackets and parentheses are removed in a single pass
+    nested_pairs = [
+        pair
+        for pair, enabled in (
+            (("[", "]"), ignore_brackets),
+            (("(", ")"), ignore_parentheses),
+        )
+        if enabled
+    ]
+
+    # Like the individual filters, the spaces left behind are always cleaned
+    # up after asterisks, brackets, parentheses and angle brackets.
+    stages = (
+        ("ignoring asterisks", ignore_asterisks, partial(_ASTERISKS_PATTERN.sub, "")),
+        (
+            "ignoring brackets",
+            bool(nested_pairs),
+            partial(_remove_nested, pairs=nested_pairs),
+        ),
+        (
+            "cleaning up spaces",
+            ignore_asterisks or bool(nested_pairs),
+            _collapse_whitespace,
+        ),
+        ("removing special characters", remove_special_char, remove_special_characters),
+        (
+            "ignoring angle brackets",
+            ignore_angle_brackets,
+            partial(_remove_nested, pairs=[("<", ">")]),
+        ),
+        ("cleaning up spaces", ignore_angle_brackets, _collapse_whitespace),
+    )
+    for name, enabled, stage in stages:
+        if not enabled:
+            continue
+        try:
+            text = stage(text)
+        except Exception as e:
+            # A failing stage is skipped, the others still run
+            logger.warning("Error {}: {}\nText: {}\nSkipping...", name, e, text)
+    return text
+
+
+def _collapse_whitespace(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def is_valid_char(char: str) -> bool:
+    """
+    Check whether a character should be kept by `remove_special_characters`.
+
+    Args:
+        char (str): The character to check.
+
+    Returns:
+        bool: True for letters, numbers, punctuation, whitespace and
+            Malayalam/Devanagari characters (except `*`).
+    """
+    if char == "*":
+        return False
+
+    return (
+        unicodedata.category(char)[0] in _VALID_MAJOR_CATEGORIES
+        or char.isspace()
+        or bisect_right(_SCRIPT_RANGE_BOUNDS, ord(char)) % 2 == 1
+    )
+
+
+_BMP_SIZE = 0x10000
+# Deletion table for the invalid ASCII characters, for use with `str.translate`
+_ASCII_SPECIAL_CHARS = "".join(
+    chr(code_point) for code_point in range(128) if not is_valid_char(chr(code_point))
+)
+_ASCII_SPECIAL_CHARS_TABLE = str.maketrans("", "", _ASCII_SPECIAL_CHARS)
+
+
+@cache
+def _bmp_valid_chars() -> np.ndarray:
+    """
+    `is_valid_char` for every character in the Basic Multilingual Plane, so
+    that whole strings can be filtered with a single NumPy lookup. Built on
+    first use rather than at import.
+    """
+    return np.array(
+        [is_valid_char(chr(code_point)) for code_point in range(_BMP_SIZE)],
+        dtype=np.bool_,
+    )
+
+
+def _filter_valid_chars(text: str) -> str:
+    # Lone surrogates are category Cs, the table drops them like other
+    # invalid characters
+    code_points = np.frombuffer(
+        text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32
+    )
+    mask = _bmp_valid_chars()[np.minimum(code_points, _BMP_SIZE - 1)]
+    # Characters outside the table (e.g. emoji) are rare, check them one by one
+    for i in np.flatnonzero(code_points >= _BMP_SIZE):
+        mask[i] = is_valid_char(chr(code_points[i]))
+    return code_points[mask].tobytes().decode("utf-32-le")
+
+
 def remove_special_characters(text: str) -> str:
     """
     Filter text to remove all non-letter, non-number, and non-punctuation characters.
     Special handling for Malayalam text.
     """
+    # ASCII text is unaffected by normalization, so skip both passes
+    if text.isascii():
+        return text.translate(_ASCII_SPECIAL_CHARS_TABLE)
+
     # Use NFD normalization for better handling of Malayalam combining characters
     normalized_text = unicodedata.normalize("NFD", text)
+    filtered_text = _filter_valid_chars(normalized_text)
+    # Final normalization to compose characters. `normalize` returns the text
+    # as is when its quick check shows it is already composed.
+    return unicodedata.normalize("NFC", filtered_text)
 
-    def is_valid_char(char: str) -> bool:
-        if char == "*":
-            return False
-
-        category = unicodedata.category(char)
-        # Include Malayalam specific categories
-        return (
-            category.startswith("L")  # Letters
-            or category.startswith("N")  # Numbers
-            or category.startswith("P")  # Punctuation
-            or char.isspace()
-            # Malayalam Unicode range
-            or ('\u0D00' <= char <= '\u0D7F')
-            # Malayalam numbers range
-            or ('\u0D66' <= char <= '\u0D6F')
-            # Hindi Unicode range (Devanagari)
-            or ('\u0900' <= char <= '\u097F')
-            # Hindi numbers range
-            or ('\u0966' <= char <= '\u096F')
-            # Extended Devanagari
-            or ('\uA8E0' <= char <= '\uA8FF')
-            # Devanagari Extended
-            or ('\u11B00' <= char <= '\u11B4F')
-        )
 
-    filtered_text = "".join(char for char in normalized_text if is_valid_char(char))
-    # Final normalization to compose characters
-    return unicodedata.normalize("NFC", filtered_text)
+@cache
+def _innermost_nested_pattern(left: str, right: str) -> re.Pattern:
+    """Pattern matching a left/right pair with no symbol of the pair inside."""
+    symbols = re.escape(left + right)
+    return re.compile(f"{re.escape(left)}[^{symbols}]*{re.escape(right)}")
+
+
+def _scan_nested(text: str, left: str, right: str) -> str:
+    result = []
+    depth = 0
+    for char in text:
+        if char == left:
+            depth += 1
+        elif char == right:
+            if depth > 0:
+                depth -= 1
+        else:
+            if depth == 0:
+                result.append(char)
+    return "".join(result)
+
+
+def _remove_nested(text: str, pairs: list[tuple[str, str]]) -> str:
+    """
+    Remove nested symbols and the text within them, for several pairs of
+    symbols. The pairs are applied in order.
+
+    Args:
+        text (str): The text to filter.
+        pairs (list[tuple[str, str]]): The left and right symbols
+            (e.g. ('[', ']') or ('(', ')')).
+
+    Returns:
+        str: The filtered text. Whitespace is left as is.
+    """
+    for left, right in pairs:
+        if left not in text and right not in text:
+            continue
+        # Strip balanced groups from the inside out, one regex pass per level
+        # of nesting, rather than walking the text character by character.
+        pattern = _innermost_nested_pattern(left, right)
+        count = 1
+        while count:
+            text, count = pattern.subn("", text)
+        # Unbalanced symbols are left, fall back to tracking the depth
+        if left in text or right in text:
+            text = _scan_nested(text, left, right)
+    return text
 
 
 def _filter_nested(text: str, left: str, right: str) -> str:
@@ -135,19 +275,11 @@ def _filter_nested(text: str, left: str, right: str) -> str:
     if not text:
         return text
 
-    result = []
-    depth = 0
-    for char in text:
-        if char == left:
-            depth += 1
-        elif char == right:
-            if depth > 0:
-                depth -= 1
-        else:
-            if depth == 0:
-                result.append(char)
-    filtered_text = "".join(result)
-    filtered_text = re.sub(r"\s+", " ", filtered_text).strip()
+    filtered_text = _remove_nested(text, [(left, right)])
+    if filtered_text == text:
+        # Nothing was removed, no need to clean up the spaces
+        return text
+    filtered_text = _WHITESPACE_PATTERN.sub(" ", filtered_text).strip()
     return filtered_text
 
 
@@ -202,17 +334,12 @@ def filter_asterisks(text):
 
     Examples:
         >>> filter_asterisks("Mix of *single* and **double** asterisks")
-        'Mix of  and  asterisks'
+        'Mix of and asterisks'
     """
-    # First remove double asterisks pattern
-    # \*\*([^*]+)\*\* matches text between double asterisks
-    filtered_text = re.sub(r"\*\*([^*]+)\*\*", "", text)
-
-    # Then remove single asterisks pattern
-    # \*([^*]+)\* matches text between single asterisks
-    filtered_text = re.sub(r"\*([^*]+)\*", "", filtered_text)
+    # Double asterisks are tried first, so **text** is removed as a whole
+    filtered_text = _ASTERISKS_PATTERN.sub("", text)
 
     # Clean up any extra spaces
-    filtered_text = re.sub(r"\s+", " ", filtered_text).strip()
+    filtered_text = _WHITESPACE_PATTERN.sub(" ", filtered_text).strip()
 
     return filtered_text